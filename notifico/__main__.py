@@ -14,14 +14,174 @@ Options:
     --host=<host>           Host to bind to. [default: localhost]
 """
 import sys
+import json
+import cPickle as pickle
 
 from docopt import docopt
+from sqlalchemy import inspect, text
+from sqlalchemy.types import LargeBinary
 
 from notifico import create_instance, db, celery
 from notifico.bots import start_manager
 from notifico.models import *
 
 
+def migrate_username_lower():
+    """
+    Adds and fills the normalized ``user.username_lower`` column on
+    databases created before it existed. This uses plain SQL, since the
+    `User` mapper can't be queried until the column exists. Safe to run
+    more than once.
+    """
+    inspector = inspect(db.engine)
+    columns = [c['name'] for c in inspector.get_columns('user')]
+    unique = inspector.get_unique_constraints('user') + [
+        i for i in inspector.get_indexes('user') if i['unique']
+    ]
+
+    if 'username_lower' not in columns:
+        db.session.execute(text(
+            'ALTER TABLE "user" ADD COLUMN username_lower VARCHAR(50)'
+        ))
+
+    db.session.execute(text(
+        'UPDATE "user" SET username_lower = LOWER(username)'
+        ' WHERE username_lower IS NULL'
+    ))
+
+    if not any(u['column_names'] == ['username_lower'] for u in unique):
+        db.session.execute(text(
+            'CREATE UNIQUE INDEX uq_user_username_lower'
+            ' ON "user" (username_lower)'
+        ))
+
+    db.session.commit()
+
+
+def migrate_timestamps():
+    """
+    Fills in creation timestamps left empty on databases created before
+    the columns had a server default. On PostgreSQL the columns are also
+    given their UTC server default and made non-nullable; SQLite can't
+    alter an existing column, and relies on the models' Python defaults.
+    Safe to run more than once.
+    """
+    columns = (
+        User.__table__.c.joined,
+        Project.__table__.c.created,
+        Hook.__table__.c.created,
+        Channel.__table__.c.created,
+        AuthToken.__table__.c.created,
+        BotEvent.__table__.c.created
+    )
+
+    for column in columns:
+        db.session.execute(
+            column.table.update().where(
+                column == None
+            ).values({column: utcnow()})
+        )
+
+    if db.engine.dialect.name == 'postgresql':
+        preparer = db.engine.dialect.identifier_preparer
+        default = utcnow().compile(dialect=db.engine.dialect)
+        for column in columns:
+            db.session.execute(text(
+                'ALTER TABLE {table}'
+                ' ALTER COLUMN {column} SET DEFAULT {default},'
+                ' ALTER COLUMN {column} SET NOT NULL'.format(
+                    table=preparer.format_table(column.table),
+                    column=preparer.quote(column.name),
+                    default=default
+                )
+            ))
+
+    db.session.commit()
+
+
+def index_names(table_name):
+    """
+    Returns the names of the indexes on `table_name`. SQLAlchemy's
+    reflection skips expression indexes, so the catalog is read directly
+    where we know how.
+    """
+    dialect = db.engine.dialect.name
+    if dialect == 'postgresql':
+        query = (
+            'SELECT indexname FROM pg_indexes'
+            ' WHERE schemaname = current_schema() AND tablename = :table'
+        )
+    elif dialect == 'sqlite':
+        query = (
+            'SELECT name FROM sqlite_master'
+            " WHERE type = 'index' AND tbl_name = :table"
+        )
+    else:
+        indexes = inspect(db.engine).get_indexes(table_name)
+        return set(i['name'] for i in indexes)
+
+    rows = db.session.execute(text(query), {'table': table_name})
+    return set(row[0] for row in rows)
+
+
+def migrate_indexes():
+    """
+    Creates the indexes declared on the models that are missing from
+    tables created before they were added. Safe to run more than once.
+    """
+    connection = db.session.connection()
+
+    for model in (User, Project, Hook):
+        table = model.__table__
+        existing = index_names(table.name)
+        for index in table.indexes:
+            if index.name not in existing:
+                index.create(bind=connection)
+
+    db.session.commit()
+
+
+def migrate_hook_config():
+    """
+    Converts hook configurations written by the old pickle-based column
+    into JSON text. On PostgreSQL the column is also changed from bytea
+    to text. Safe to run more than once.
+    """
+    columns = inspect(db.engine).get_columns('hook')
+    config_type = next(c['type'] for c in columns if c['name'] == 'config')
+    if not isinstance(config_type, LargeBinary):
+        # Already a text column, nothing to do.
+        return
+
+    rows = db.session.execute(text('SELECT id, config FROM hook')).fetchall()
+
+    if db.engine.dialect.name == 'postgresql':
+        # Every row is rewritten below, so the old values can be dropped.
+        db.session.execute(text(
+            'ALTER TABLE hook ALTER COLUMN config TYPE TEXT USING NULL'
+        ))
+
+    for hook_id, config in rows:
+        if config is None:
+            continue
+
+        # Binary columns are returned as buffers.
+        config = str(config)
+        try:
+            json.loads(config)
+        except ValueError:
+            # This is the only place pickled configurations are ever
+            # loaded, and only from our own database.
+            config = json.dumps(pickle.loads(config))
+
+        db.session.execute(
+            text('UPDATE hook SET config = :config WHERE id = :id'),
+            {'config': config, 'id': hook_id}
+        )
+
+    db.session.commit()
+
+
 def main(argv):
     args = docopt(__doc__, argv=argv[1:])
 
@@ -39,6 +199,16 @@ def main(argv):
         with app.app_context():
             # Let SQLAlchemy create any missing tables.
             db.create_all()
+            # Add normalized usernames for users created before they
+            # were stored. This must happen before anything queries User.
+            migrate_username_lower()
+            # Give creation timestamps a UTC default and fill in any
+            # that are missing.
+            migrate_timestamps()
+            # Add any indexes missing from older tables.
+            migrate_indexes()
+            # Convert pickled hook configurations to JSON.
+            migrate_hook_config()
     elif args['worker']:
         app = create_instance()
         with app.app_context():
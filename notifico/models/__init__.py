@@ -1,5 +1,10 @@
 # -*- coding: utf8 -*-
+import json
+
 from sqlalchemy import func
+from sqlalchemy.sql import expression
+from sqlalchemy.types import TypeDecorator, Text, DateTime
+from sqlalchemy.ext.compiler import compiles
 from sqlalchemy.ext.hybrid import Comparator
 
 
@@ -7,6 +12,42 @@ class CaseInsensitiveComparator(Comparator):
     def __eq__(self, other):
         return func.lower(self.__clause_element__()) == func.lower(other)
 
+
+class JSONType(TypeDecorator):
+    """
+    Stores a JSON-serializable value as text.
+    """
+    impl = Text
+    cache_ok = True
+
+    def process_bind_param(self, value, dialect):
+        if value is None:
+            return None
+        return json.dumps(value)
+
+    def process_result_value(self, value, dialect):
+        if value is None:
+            return None
+        return json.loads(value)
+
+
+class utcnow(expression.FunctionElement):
+    """
+    The current time in UTC, for use as a server default. Timestamps are
+    stored without a time zone and compared against ``utcnow()``.
+    """
+    type = DateTime()
+
+
+@compiles(utcnow)
+def _utcnow_default(element, compiler, **kw):
+    return 'CURRENT_TIMESTAMP'
+
+
+@compiles(utcnow, 'postgresql')
+def _utcnow_postgresql(element, compiler, **kw):
+    return "TIMEZONE('utc', CURRENT_TIMESTAMP)"
+
 from notifico.models.user import *
 from notifico.models.bot import *
 from notifico.models.channel import *
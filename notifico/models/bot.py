@@ -3,11 +3,15 @@ __all__ = ('BotEvent',)
 import datetime
 
 from notifico import db
+from notifico.models import utcnow
 
 
 class BotEvent(db.Model):
     id = db.Column(db.Integer, primary_key=True)
-    created = db.Column(db.TIMESTAMP(), default=datetime.datetime.utcnow)
+    created = db.Column(
+        db.TIMESTAMP(), default=datetime.datetime.utcnow,
+        server_default=utcnow(), nullable=False
+    )
 
     channel = db.Column(db.String(80))
     host = db.Column(db.String(255), nullable=False)
@@ -29,3 +33,21 @@ class BotEvent(db.Model):
         c.event = event
         c.channel = channel
         return c
+
+    @classmethod
+    def bulk_new(cls, rows, batch_size=500):
+        """
+        Inserts a new event for each dictionary in the iterable `rows`,
+        which take the same keys as :meth:`new`. Events are inserted in
+        batches of `batch_size`, bypassing the ORM unit of work, so no
+        `BotEvent` objects are returned.
+        """
+        batch = []
+        for row in rows:
+            batch.append(row)
+            if len(batch) >= batch_size:
+                db.session.bulk_insert_mappings(cls, batch)
+                batch = []
+
+        if batch:
+            db.session.bulk_insert_mappings(cls, batch)
@@ -5,12 +5,16 @@ import datetime
 from sqlalchemy import func
 
 from notifico import db
+from notifico.models import utcnow
 from notifico.models.bot import BotEvent
 
 
 class Channel(db.Model):
     id = db.Column(db.Integer, primary_key=True)
-    created = db.Column(db.TIMESTAMP(), default=datetime.datetime.utcnow)
+    created = db.Column(
+        db.TIMESTAMP(), default=datetime.datetime.utcnow,
+        server_default=utcnow(), nullable=False
+    )
 
     channel = db.Column(db.String(80), nullable=False)
     host = db.Column(db.String(255), nullable=False)
@@ -20,7 +24,7 @@ class Channel(db.Model):
 
     project_id = db.Column(db.Integer, db.ForeignKey('project.id'))
     project = db.relationship('Project', backref=db.backref(
-        'channels', order_by=id, lazy='dynamic', cascade='all, delete-orphan'
+        'channels', order_by=id, lazy='select', cascade='all, delete-orphan'
     ))
 
     @classmethod
@@ -5,23 +5,33 @@ import base64
 import datetime
 
 from notifico import db
+from notifico.models import JSONType, utcnow
 from notifico.services.hooks import HookService
 
 
 class Hook(db.Model):
     id = db.Column(db.Integer, primary_key=True)
-    created = db.Column(db.TIMESTAMP(), default=datetime.datetime.utcnow)
+    created = db.Column(
+        db.TIMESTAMP(), default=datetime.datetime.utcnow,
+        server_default=utcnow(), nullable=False
+    )
     key = db.Column(db.String(255), nullable=False)
     service_id = db.Column(db.Integer)
-    config = db.Column(db.PickleType)
+    config = db.Column(JSONType)
 
     project_id = db.Column(db.Integer, db.ForeignKey('project.id'))
     project = db.relationship('Project', backref=db.backref(
-        'hooks', order_by=id, lazy='dynamic', cascade='all, delete-orphan'
+        'hooks', order_by=id, lazy='select', cascade='all, delete-orphan'
     ))
 
     message_count = db.Column(db.Integer, default=0)
 
+    __table_args__ = (
+        # Every webhook delivery looks up its hook by key and project.
+        db.Index('ix_hook_key_project', 'key', 'project_id'),
+        db.Index('ix_hook_service_project', 'service_id', 'project_id'),
+    )
+
     @classmethod
     def new(cls, service_id, config=None):
         p = cls()
@@ -32,7 +42,8 @@ class Hook(db.Model):
 
     @staticmethod
     def _new_key():
-        return base64.urlsafe_b64encode(os.urandom(24))[:24]
+        # 18 random bytes encode to exactly 24 characters.
+        return base64.urlsafe_b64encode(os.urandom(18))
 
     @classmethod
     def by_service_and_project(cls, service_id, project_id):
@@ -41,6 +52,31 @@ class Hook(db.Model):
             project_id=project_id
         ).first()
 
+    @property
+    def parsed_branches(self):
+        """
+        The lowercased branch names this hook is limited to, or an empty
+        set if every branch should be forwarded.
+        """
+        branches = (self.config or {}).get('branches') or []
+
+        # Only rebuild the set if the configuration changed since we last
+        # looked.
+        cached = getattr(self, '_parsed_branches', None)
+        if cached is None or cached[0] != branches:
+            if isinstance(branches, basestring):
+                # Hooks saved before branches were stored pre-parsed
+                # still hold the raw string.
+                parsed = frozenset(HookService.parse_branches(branches))
+                branches_key = branches
+            else:
+                parsed = frozenset(branches)
+                # Keep a copy, so changes to the list are noticed.
+                branches_key = list(branches)
+            self._parsed_branches = (branches_key, parsed)
+
+        return self._parsed_branches[1]
+
     @property
     def hook(self):
         return HookService.services[self.service_id]
@@ -2,28 +2,37 @@
 __all__ = ('Project',)
 import datetime
 
-from sqlalchemy import or_
+from sqlalchemy import or_, func
 from sqlalchemy.ext.hybrid import hybrid_property
 
 from notifico import db
-from notifico.models import CaseInsensitiveComparator
+from notifico.models import CaseInsensitiveComparator, utcnow
 
 
 class Project(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String(50), nullable=False)
-    created = db.Column(db.TIMESTAMP(), default=datetime.datetime.utcnow)
+    created = db.Column(
+        db.TIMESTAMP(), default=datetime.datetime.utcnow,
+        server_default=utcnow(), nullable=False
+    )
     public = db.Column(db.Boolean, default=True)
     website = db.Column(db.String(1024))
 
     owner_id = db.Column(db.Integer, db.ForeignKey('user.id'))
     owner = db.relationship('User', backref=db.backref(
-        'projects', order_by=id, lazy='dynamic', cascade='all, delete-orphan'
+        'projects', order_by=id, lazy='select', cascade='all, delete-orphan'
     ))
 
     full_name = db.Column(db.String(101), nullable=False, unique=True)
     message_count = db.Column(db.Integer, default=0)
 
+    __table_args__ = (
+        # Projects are looked up by owner and case-insensitive name
+        # (see `by_name_and_owner`).
+        db.Index('ix_project_owner_name_lower', owner_id, func.lower(name)),
+    )
+
     @classmethod
     def new(cls, name, public=True, website=None):
         c = cls()
@@ -50,6 +59,34 @@ class Project(db.Model):
         q = q.filter(cls.name_i == name)
         return q.first()
 
+    @classmethod
+    def owned_by(cls, owner, public_only=False):
+        """
+        Returns a query for the projects owned by `owner`. If `public_only`
+        is ``True``, only public projects are included.
+        """
+        q = cls.query.filter(cls.owner_id == owner.id)
+        if public_only:
+            q = q.filter(cls.public == True)
+        return q
+
+    @classmethod
+    def public_counts(cls, owners):
+        """
+        Returns a dictionary mapping the id of each user in `owners` to
+        their number of public projects, using a single query.
+        """
+        owner_ids = [owner.id for owner in owners]
+        if not owner_ids:
+            return {}
+
+        q = (
+            db.session.query(cls.owner_id, func.count(cls.id))
+            .filter(cls.owner_id.in_(owner_ids), cls.public == True)
+            .group_by(cls.owner_id)
+        )
+        return dict(q)
+
     @classmethod
     def visible(cls, q, user=None):
         """
@@ -3,6 +3,7 @@ __all__ = ('AuthToken',)
 import datetime
 
 from notifico import db
+from notifico.models import utcnow
 
 
 class AuthToken(db.Model):
@@ -10,13 +11,16 @@ class AuthToken(db.Model):
     Service authentication tokens, such as those used for Github's OAuth.
     """
     id = db.Column(db.Integer, primary_key=True)
-    created = db.Column(db.TIMESTAMP(), default=datetime.datetime.utcnow)
+    created = db.Column(
+        db.TIMESTAMP(), default=datetime.datetime.utcnow,
+        server_default=utcnow(), nullable=False
+    )
     name = db.Column(db.String(50), nullable=False)
     token = db.Column(db.String(512), nullable=False)
 
     owner_id = db.Column(db.Integer, db.ForeignKey('user.id'))
     owner = db.relationship('User', backref=db.backref(
-        'tokens', order_by=id, lazy='dynamic', cascade='all, delete-orphan'
+        'tokens', order_by=id, lazy='select', cascade='all, delete-orphan'
     ))
 
     @classmethod
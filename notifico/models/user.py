@@ -1,27 +1,38 @@
 # -*- coding: utf8 -*-
 __all__ = ('User', 'Group')
 import os
+import hmac
 import base64
 import hashlib
 import datetime
 
-from sqlalchemy.ext.hybrid import hybrid_property
+from sqlalchemy.sql import exists
 
 from notifico import db
-from notifico.models import CaseInsensitiveComparator
+from notifico.models import utcnow
 
 
 class User(db.Model):
+    #: Prefix identifying passwords hashed using PBKDF2-SHA256.
+    PASSWORD_SCHEME = 'pbkdf2_sha256'
+    #: Number of PBKDF2 iterations used when hashing new passwords.
+    PASSWORD_ITERATIONS = 100000
+
     id = db.Column(db.Integer, primary_key=True)
 
     # ---
     # Required Fields
     # ---
     username = db.Column(db.String(50), unique=True, nullable=False)
-    email = db.Column(db.String(255), nullable=False)
+    #: The normalized (lowercase) `username`, used for lookups.
+    username_lower = db.Column(db.String(50), unique=True)
+    email = db.Column(db.String(255), nullable=False, index=True)
     password = db.Column(db.String(255), nullable=False)
     salt = db.Column(db.String(8), nullable=False)
-    joined = db.Column(db.TIMESTAMP(), default=datetime.datetime.utcnow)
+    joined = db.Column(
+        db.TIMESTAMP(), default=datetime.datetime.utcnow,
+        server_default=utcnow(), nullable=False
+    )
 
     # ---
     # Public Profile Fields
@@ -37,6 +48,7 @@ class User(db.Model):
         u.salt = cls._create_salt()
         u.password = cls._hash_password(password, u.salt)
         u.username = username.strip()
+        u.username_lower = u.username.lower()
         return u
 
     @staticmethod
@@ -44,15 +56,58 @@ class User(db.Model):
         """
         Returns a new base64 salt.
         """
-        return base64.b64encode(os.urandom(8))[:8]
+        # 6 random bytes encode to exactly 8 characters.
+        return base64.b64encode(os.urandom(6))
+
+    @classmethod
+    def _hash_password(cls, password, salt, iterations=None):
+        """
+        Returns a hashed password from `password` and `salt`, in the form
+        ``pbkdf2_sha256$<iterations>$<hexdigest>``.
+        """
+        iterations = iterations or cls.PASSWORD_ITERATIONS
+        digest = hashlib.pbkdf2_hmac(
+            'sha256',
+            password.strip().encode('utf8'),
+            salt.encode('ascii') if isinstance(salt, unicode) else salt,
+            iterations
+        )
+        return '{scheme}${iterations}${digest}'.format(
+            scheme=cls.PASSWORD_SCHEME,
+            iterations=iterations,
+            digest=digest.encode('hex')
+        )
 
     @staticmethod
-    def _hash_password(password, salt):
+    def _hash_password_legacy(password, salt):
         """
-        Returns a hashed password from `password` and `salt`.
+        Returns a hashed password from `password` and `salt` using the
+        original single-round SHA-256 scheme.
         """
         return hashlib.sha256(salt + password.strip()).hexdigest()
 
+    def check_password(self, password):
+        """
+        Returns ``True`` if `password` matches this users password. Passwords
+        stored using the legacy scheme are rehashed on success.
+        """
+        scheme, _, rest = self.password.partition('$')
+        if scheme == self.PASSWORD_SCHEME:
+            iterations = int(rest.partition('$')[0])
+            return hmac.compare_digest(
+                str(self.password),
+                self._hash_password(password, self.salt, iterations)
+            )
+
+        if not hmac.compare_digest(
+                str(self.password),
+                self._hash_password_legacy(password, self.salt)):
+            return False
+
+        # Upgrade the legacy hash now that we know the password.
+        self.password = self._hash_password(password, self.salt)
+        return True
+
     def set_password(self, new_password):
         self.salt = self._create_salt()
         self.password = self._hash_password(new_password, self.salt)
@@ -63,15 +118,21 @@ class User(db.Model):
 
     @classmethod
     def by_username(cls, username):
-        return cls.query.filter_by(username_i=username).first()
+        return cls.query.filter_by(
+            username_lower=username.lower().strip()
+        ).first()
 
     @classmethod
     def email_exists(cls, email):
-        return cls.query.filter_by(email=email.lower().strip()).count() >= 1
+        return db.session.query(exists().where(
+            cls.email == email.lower().strip()
+        )).scalar()
 
     @classmethod
     def username_exists(cls, username):
-        return cls.query.filter_by(username_i=username).count() >= 1
+        return db.session.query(exists().where(
+            cls.username_lower == username.lower().strip()
+        )).scalar()
 
     @classmethod
     def login(cls, username, password):
@@ -80,23 +141,17 @@ class User(db.Model):
         correct, otherwise ``None``.
         """
         u = cls.by_username(username)
-        if u and u.password == cls._hash_password(password, u.salt):
+        if u and u.check_password(password):
             return u
         return None
 
-    @hybrid_property
-    def username_i(self):
-        return self.username.lower()
-
-    @username_i.comparator
-    def username_i(cls):
-        return CaseInsensitiveComparator(cls.username)
-
     def active_projects(self, limit=5):
         """
         Return this users most active projets (by descending message count).
         """
-        q = self.projects.order_by(False).order_by('-message_count')
+        from notifico.models import Project
+
+        q = Project.owned_by(self).order_by(Project.message_count.desc())
         q = q.limit(limit)
         return q
 
@@ -1,12 +1,53 @@
 # -*- coding: utf8 -*-
 __all__ = ('BitbucketHook',)
 
-import json
+import hashlib
+from collections import Counter, OrderedDict
+
+try:
+    # ujson is considerably faster at parsing large payloads, but is
+    # optional.
+    from ujson import loads as _jloads
+except ImportError:
+    from json import loads as _jloads
 
 from flask.ext import wtf
 
 from notifico.services.hooks import HookService
 
+#: The maximum number of simplified payloads to keep around.
+_SIMPLIFIED_CACHE_SIZE = 512
+#: Recently simplified payloads, keyed on a digest of the raw payload,
+#: from least to most recently used.
+_simplified_cache = OrderedDict()
+
+
+def _precolor(template):
+    """
+    Substitutes the mIRC color placeholders in `template` once, leaving
+    any doubled-brace fields for per-message formatting.
+    """
+    return template.format(**HookService.colors)
+
+
+#: Line templates with colors already applied.
+_TPL_PROJECT = _precolor(u'{GREY}[{BLUE}{{name}}{GREY}]')
+_TPL_PUSHER = _precolor(u'{TEAL}{{pusher}}{GREY} pushed')
+_TPL_COUNT = _precolor(u'{TEAL}{{count}}{GREY} {{commits}}')
+_TPL_BRANCH = _precolor(u'to {TEAL}{{branch}}{GREY}')
+_TPL_LINK = _precolor(u'{LIGHT_GREY}{{link}}{GREY}')
+_TPL_HIGHLIGHT = _precolor(u'{TEAL}{{0}}{GREY}')
+#: The complete summary line for the most common push, a single commit
+#: with a known pusher and branch.
+_TPL_SINGLE_COMMIT = u' '.join((
+    _TPL_PROJECT,
+    _TPL_PUSHER,
+    _TPL_COUNT.format(count=1, commits='commit'),
+    _TPL_BRANCH,
+    u'[+{added}/-{removed}/\u00B1{modified}]',
+    _TPL_LINK
+))
+
 
 class BitbucketConfigForm(wtf.Form):
     branches = wtf.TextField('Branches', validators=[
@@ -40,22 +81,18 @@ def simplify_payload(payload):
         'branch': None,
         'tag': None,
         'pusher': None,
-        'files': {
-            'all': set(),
-            'added': set(),
-            'removed': set(),
-            'modified': set()
-        },
+        'files': None,
         'original': payload
     }
 
+    # Every (type, name) file change among all the commits in this push.
+    changes = set()
+
     for commit in payload.get('commits', tuple()):
-        # Summarize file changes among all the commits
-        # in this push.
-        for file_ in commit.get('files', tuple()):
-            type_, name = file_['type'], file_['file']
-            result['files'][type_].add(name)
-            result['files']['all'].add(name)
+        changes.update(
+            (file_['type'], file_['file'])
+            for file_ in commit.get('files', tuple())
+        )
 
         # Usually only the last commit in the chain will
         # include the "branch" or "branches" tag.
@@ -66,6 +103,44 @@ def simplify_payload(payload):
     # The username of whoever made this push.
     result['pusher'] = payload.get('user')
 
+    # Only the number of files changed is ever shown, so summarize
+    # the changes as counts.
+    counts = Counter(type_ for type_, _ in changes)
+    result['files'] = {
+        'all': len(set(name for _, name in changes)),
+        'added': counts['added'],
+        'removed': counts['removed'],
+        'modified': counts['modified']
+    }
+
+    return result
+
+
+def _simplify_cached(p):
+    """
+    Returns the simplified payload for the raw JSON payload `p`, which
+    may be either text or UTF-8 encoded bytes, or ``None`` if `p` isn't
+    a JSON object.
+
+    Bitbucket will happily redeliver the same payload on retries, so the
+    most recent results are kept and reused for identical payloads.
+    """
+    if isinstance(p, unicode):
+        p = p.encode('utf8')
+    key = hashlib.sha1(p).digest()
+
+    try:
+        result = _simplified_cache.pop(key)
+    except KeyError:
+        payload = _jloads(p)
+        if not isinstance(payload, dict):
+            return None
+
+        result = simplify_payload(payload)
+        if len(_simplified_cache) >= _SIMPLIFIED_CACHE_SIZE:
+            _simplified_cache.popitem(last=False)
+
+    _simplified_cache[key] = result
     return result
 
 
@@ -76,54 +151,57 @@ def _make_summary_line(hook, j, config):
     original = j['original']
     show_branch = config.get('show_branch', True)
 
+    # TODO: We can apparently build URLs to show comparisons
+    #       using /compare/<lc>..<lr>, which is completely
+    #       undocumented. For now build a link to the last
+    #       commit in the set.
+    link = BitbucketHook.shorten(
+        original['canon_url'] +
+        original['repository']['absolute_url'] +
+        u'commits/' +
+        original['commits'][-1]['node']
+    )
+
+    files = j['files']
+    if (len(original['commits']) == 1 and j['pusher'] and
+            show_branch and j['branch']):
+        # Fast path for the typical single-commit push.
+        return _TPL_SINGLE_COMMIT.format(
+            name=original['repository']['name'],
+            pusher=j['pusher'],
+            branch=j['branch'],
+            added=files['added'],
+            removed=files['removed'],
+            modified=files['modified'],
+            link=link
+        )
+
     # Buffer for the line summary.
     line = []
 
     # Project name
-    line.append(u'{GREY}[{BLUE}{name}{GREY}]'.format(
-        name=original['repository']['name'],
-        **HookService.colors
-    ))
+    line.append(_TPL_PROJECT.format(name=original['repository']['name']))
 
     if j['pusher']:
-        line.append(u'{TEAL}{pusher}{GREY} pushed'.format(
-            pusher=j['pusher'],
-            **HookService.colors
-        ))
+        line.append(_TPL_PUSHER.format(pusher=j['pusher']))
 
     # Commit count
-    line.append(u'{TEAL}{count}{GREY} {commits}'.format(
+    line.append(_TPL_COUNT.format(
         count=len(original['commits']),
-        commits='commit' if len(original['commits']) == 1 else 'commits',
-        **HookService.colors
+        commits='commit' if len(original['commits']) == 1 else 'commits'
     ))
 
     if show_branch and j['branch']:
-        line.append(u'to {TEAL}{branch}{GREY}'.format(
-            branch=j['branch'],
-            **HookService.colors
-        ))
+        line.append(_TPL_BRANCH.format(branch=j['branch']))
 
     # File movement summary.
     line.append(u'[+{added}/-{removed}/\u00B1{modified}]'.format(
-        added=len(j['files']['added']),
-        removed=len(j['files']['removed']),
-        modified=len(j['files']['modified'])
+        added=files['added'],
+        removed=files['removed'],
+        modified=files['modified']
     ))
 
-    # TODO: We can apparently build URLs to show comparisons
-    #       using /compare/<lc>..<lr>, which is completely
-    #       undocumented. For now build a link to the last
-    #       commit in the set.
-    link = u'{0}{1}commits/'.format(
-        original['canon_url'],
-        original['repository']['absolute_url'],
-        original['commits'][-1]['node']
-    )
-    line.append(u'{LIGHT_GREY}{0}{GREY}'.format(
-        BitbucketHook.shorten(link),
-        **HookService.colors
-    ))
+    line.append(_TPL_LINK.format(link=link))
 
     return u' '.join(line)
 
@@ -138,20 +216,11 @@ def _make_commit_line(hook, j, commit):
     config = hook.config or {}
     show_raw_author = config.get('show_raw_author', False)
 
-    line.append(u'{GREY}[{BLUE}{name}{GREY}]'.format(
-        name=original['repository']['name'],
-        **HookService.colors
-    ))
-
-    line.append(u'{TEAL}{0}{GREY}'.format(
-        commit['raw_author'] if show_raw_author else commit['author'],
-        **HookService.colors
-    ))
-
-    line.append(u'{TEAL}{0}{GREY}'.format(
-        commit['node'][:7],
-        **HookService.colors
+    line.append(_TPL_PROJECT.format(name=original['repository']['name']))
+    line.append(_TPL_HIGHLIGHT.format(
+        commit['raw_author'] if show_raw_author else commit['author']
     ))
+    line.append(_TPL_HIGHLIGHT.format(commit['node'][:7]))
 
     line.append(u'-')
     line.append(commit['message'])
@@ -169,27 +238,37 @@ class BitbucketHook(HookService):
 
     @classmethod
     def handle_request(cls, user, request, hook):
-        p = request.form.get('payload', None)
+        if request.mimetype == 'application/json':
+            # The payload is the body itself, so skip form parsing and
+            # hand the raw bytes straight to the JSON parser.
+            p = request.get_data(cache=False)
+        else:
+            p = request.form.get('payload', None)
+
         if not p:
             return
 
-        j = simplify_payload(json.loads(p))
+        j = _simplify_cached(p)
+        # Only the original POST service schema, with a top-level
+        # "commits" list, is understood here. Bitbucket 2.0 webhooks
+        # (shaped like {"push": ..., "actor": ...}) are ignored.
+        if j is None or 'commits' not in j['original']:
+            return
+
         original = j['original']
 
         config = hook.config or {}
         strip = not config.get('use_colors', True)
-        branches = config.get('branches', None)
+        branches = hook.parsed_branches
 
         if not original['commits']:
             # TODO: No commits, nothing to do. We should add an option for
             # showing tag activity.
             return
 
-        if branches:
-            branches = [b.strip().lower() for b in branches.split(',')]
-            if j['branch'] and j['branch'].lower() not in branches:
-                # This isn't a branch the user wants.
-                return
+        if branches and j['branch'] and j['branch'].lower() not in branches:
+            # This isn't a branch the user wants.
+            return
 
         yield cls.message(_make_summary_line(hook, j, config), strip=strip)
         for commit in original['commits']:
@@ -109,33 +109,34 @@ def _create_push_summary(project_name, j, config):
     """
     original = j['original']
     show_branch = config.get('show_branch', True)
+    colors = HookService.colors
 
     # Build the push summary.
     line = []
 
     line.append(u'{GREY}[{BLUE}{name}{GREY}]'.format(
         name=project_name,
-        **HookService.colors
+        **colors
     ))
 
     # The user doing the push, if available.
     if j['pusher']:
         line.append(u'{TEAL}{pusher}{GREY} pushed'.format(
             pusher=j['pusher'],
-            **HookService.colors
+            **colors
         ))
 
     # The number of commits included in this push.
     line.append(u'{TEAL}{count}{GREY} {commits}'.format(
         count=len(original['commits']),
         commits='commit' if len(original['commits']) == 1 else 'commits',
-        **HookService.colors
+        **colors
     ))
 
     if show_branch and j['branch']:
         line.append(u'to {TEAL}{branch}{GREY}'.format(
             branch=j['branch'],
-            **HookService.colors
+            **colors
         ))
 
     # File movement summary.
@@ -148,7 +149,7 @@ def _create_push_summary(project_name, j, config):
     # The shortened URL linking to the compare page.
     line.append(u'{LIGHT_GREY}{compare_link}{GREY}'.format(
         compare_link=GithubHook.shorten(original['compare']),
-        **HookService.colors
+        **colors
     ))
 
     return u' '.join(line)
@@ -160,6 +161,7 @@ def _create_commit_summary(project_name, j, config):
     """
     prefer_username = config.get('prefer_username', True)
     title_only = config.get('title_only', False)
+    colors = HookService.colors
 
     original = j['original']
 
@@ -177,7 +179,7 @@ def _create_commit_summary(project_name, j, config):
 
         line.append(u'{GREY}[{BLUE}{name}{GREY}]'.format(
             name=project_name,
-            **HookService.colors
+            **colors
         ))
 
         # Show the committer.
@@ -195,12 +197,12 @@ def _create_commit_summary(project_name, j, config):
         if attribute_to:
             line.append(u'{TEAL}{attribute_to}{GREY}'.format(
                 attribute_to=attribute_to,
-                **HookService.colors
+                **colors
             ))
 
         line.append(u'{TEAL}{sha}{GREY}'.format(
             sha=commit['id'][:7],
-            **HookService.colors
+            **colors
         ))
 
         line.append(u'-')
@@ -574,7 +576,7 @@ class GithubHook(HookService):
         # Should we get rid of mIRC colors before sending?
         strip = not config.get('use_colors', True)
         # Branch names to filter on.
-        branches = config.get('branches', None)
+        branches = hook.parsed_branches
         # Display tag activity?
         show_tags = config.get('show_tags', True)
         # Limit the number of lines to display before the summary.
@@ -586,7 +588,6 @@ class GithubHook(HookService):
 
         if branches:
             # The user wants to filter by branch name.
-            branches = [b.strip().lower() for b in branches.split(',')]
             if j['branch'] and j['branch'].lower() not in branches:
                 # This isn't a branch the user wants.
                 return
@@ -642,6 +643,7 @@ class GithubHook(HookService):
         """
         original = j['original']
         full_project_name = config.get('full_project_name', False)
+        colors = HookService.colors
 
         line = []
 
@@ -657,14 +659,14 @@ class GithubHook(HookService):
 
         line.append(u'{GREY}[{BLUE}{name}{GREY}]'.format(
             name=project_name,
-            **HookService.colors
+            **colors
         ))
 
         # The user doing the push, if available.
         if j['pusher']:
             line.append(u'{TEAL}{pusher}{GREY}'.format(
                 pusher=j['pusher'],
-                **HookService.colors
+                **colors
             ))
 
         if j['tag']:
@@ -674,20 +676,20 @@ class GithubHook(HookService):
             # The sha1 hash of the head (tagged) commit.
             line.append(u'{TEAL}{sha}{GREY} as'.format(
                 sha=original['head_commit']['id'][:7],
-                **HookService.colors
+                **colors
             ))
 
             # The tag itself.
             line.append(u'{TEAL}{tag}{GREY}'.format(
                 tag=j['tag'],
-                **HookService.colors
+                **colors
             ))
 
         if original['head_commit']:
             # The shortened URL linking to the head commit.
             line.append(u'{LIGHT_GREY}{link}{GREY}'.format(
                 link=GithubHook.shorten(original['head_commit']['url']),
-                **HookService.colors
+                **colors
             ))
 
         return u' '.join(line)
@@ -61,6 +61,17 @@ class HookService(object):
         message = re.sub(r'\s+', ' ', message)
         return message
 
+    @staticmethod
+    def parse_branches(branches):
+        """
+        Returns a sorted list of the unique, lowercased branch names in
+        the comma-seperated string `branches`.
+        """
+        return sorted(set(
+            b.strip().lower() for b in (branches or '').split(',')
+            if b.strip()
+        ))
+
     @classmethod
     def _redis(cls):
         """
@@ -70,8 +81,6 @@ class HookService(object):
 
     @classmethod
     def _request(cls, user, request, hook, *args, **kwargs):
-        combined = []
-
         ms = MessageService(redis=cls._redis())
         handler = cls.handle_request(user, request, hook, *args, **kwargs)
 
@@ -80,10 +89,13 @@ class HookService(object):
             # so don't do anything at all.
             return
 
-        for message in handler:
-            combined.append(message)
-            for channel in hook.project.channels:
-                ms.send_message(message, channel)
+        # Queue up everything at once rather than making a round-trip
+        # for every message.
+        combined = list(handler)
+        if not combined:
+            return
+
+        ms.send_messages(combined, hook.project.channels)
 
         if hook.project.public:
             ms.log_message('\n'.join(combined), hook.project)
@@ -110,8 +122,14 @@ class HookService(object):
         Returns a dictionary of configuration options processed from `form`.
         By default, simply iterates all fields, taking their ``.id`` as the
         key and ``.data`` as value.
+
+        A ``branches`` field is stored pre-parsed (see `parse_branches`) so
+        it doesn't need to be parsed again for every push.
         """
-        return dict((f.id, f.data) for f in form)
+        config = dict((f.id, f.data) for f in form)
+        if 'branches' in config:
+            config['branches'] = cls.parse_branches(config['branches'])
+        return config
 
     @classmethod
     def load_form(cls, form, config):
@@ -122,7 +140,10 @@ class HookService(object):
             return
 
         for f in form:
-            if f.id in config:
+            if f.id == 'branches' and isinstance(config.get(f.id), list):
+                # Stored pre-parsed by `pack_form`.
+                f.data = u', '.join(config[f.id])
+            elif f.id in config:
                 f.data = config[f.id]
 
         return form
@@ -29,9 +29,10 @@ class MessageService(object):
             )
         ]
 
-    def send_message(self, message, channel):
+    def _queue_dump(self, message, channel):
         """
-        Sends `message` to `channel`.
+        Returns the serialized queue entry delivering `message` to
+        `channel`.
         """
         final_message = {
             # What we're delivering.
@@ -48,8 +49,29 @@ class MessageService(object):
                 'ssl': channel.ssl
             }
         }
-        message_dump = json.dumps(final_message)
-        self.r.rpush(self.key_queue_messages, message_dump)
+        return json.dumps(final_message)
+
+    def send_message(self, message, channel):
+        """
+        Sends `message` to `channel`.
+        """
+        self.r.rpush(
+            self.key_queue_messages,
+            self._queue_dump(message, channel)
+        )
+
+    def send_messages(self, messages, channels):
+        """
+        Sends each of `messages` to every channel in `channels`, in order,
+        using a single push to the queue.
+        """
+        message_dumps = [
+            self._queue_dump(message, channel)
+            for message in messages
+            for channel in channels
+        ]
+        if message_dumps:
+            self.r.rpush(self.key_queue_messages, *message_dumps)
 
     def log_message(self, message, project, log_cap=200):
         """
@@ -53,6 +53,8 @@ def login():
     form = UserLoginForm()
     if form.validate_on_submit():
         u = User.by_username(form.username.data)
+        # Validation may have upgraded a legacy password hash.
+        db.session.commit()
         session['_u'] = u.id
         session['_uu'] = u.username
         return redirect(url_for('projects.dashboard', u=u.username))
@@ -236,8 +238,7 @@ def settings(do=None):
             del session['_u']
         if '_ue' in session:
             del session['_ue']
-        # Remove the user from the DB.
-        g.user.projects.order_by(False).delete()
+        # Remove the user (and, by cascade, their projects) from the DB.
         db.session.delete(g.user)
         db.session.commit()
 
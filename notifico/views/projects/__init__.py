@@ -115,16 +115,13 @@ def dashboard(u):
 
     is_owner = (g.user and g.user.id == u.id)
 
-    # Get all projects by decending creation date.
+    # Get all projects by decending creation date. If this isn't the
+    # users own page, only display public projects.
     projects = (
-        u.projects
-        .order_by(False)
+        Project.owned_by(u, public_only=not is_owner)
         .order_by(Project.created.desc())
+        .all()
     )
-    if not is_owner:
-        # If this isn't the users own page, only
-        # display public projects.
-        projects = projects.filter_by(public=True)
 
     return render_template('dashboard.html',
         user=u,
@@ -243,7 +240,7 @@ def details(u, p):
 
     visible_channels = p.channels
     if not can_modify:
-        visible_channels = visible_channels.filter_by(public=True)
+        visible_channels = [c for c in visible_channels if c.public]
 
     return render_template(
         'project_details.html',
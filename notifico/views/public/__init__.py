@@ -120,7 +120,8 @@ def users(page=1):
     return render_template(
         'users.html',
         pagination=pagination,
-        per_page=per_page
+        per_page=per_page,
+        public_counts=Project.public_counts(pagination.items)
     )
 
 